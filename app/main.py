@@ -1,55 +1,17 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from pathlib import Path
-import json
+from typing import List, Optional, Dict, Tuple
+from bisect import bisect_left
 import re
 
+from .scanner import scan_sources
+
 # ---------------------------------------------------------------------
 # APP INIT
 # ---------------------------------------------------------------------
 app = FastAPI(title="Legacy Table Scanner (Refactored Version)")
 
 
-# ---------------------------------------------------------------------
-# LOAD DYNAMIC MAPPING (tables.json)
-# ---------------------------------------------------------------------
-MAPPING_PATH = Path(__file__).parent / "tables.json"
-
-with open(MAPPING_PATH, "r", encoding="utf-8") as f:
-    TABLE_MAP: Dict[str, str] = json.load(f)
-
-OLD_TABLES = list(TABLE_MAP.keys())
-
-# Build dynamic regex-safe table list
-TBL_GROUP = "|".join(sorted(map(re.escape, OLD_TABLES), key=len, reverse=True))
-
-
-# ---------------------------------------------------------------------
-# REGEX DEFINITIONS
-# ---------------------------------------------------------------------
-REGEX: Dict[str, re.Pattern] = {
-    "DML": re.compile(
-        rf"(?P<full>(?P<stmt>\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\b|\bMODIFY\b)"
-        rf"[\s\S]*?\b(FROM|INTO|UPDATE|DELETE\s+FROM)\b\s+(?P<obj>{TBL_GROUP})\b)",
-        re.IGNORECASE,
-    ),
-    "CLEAR": re.compile(
-        rf"(?P<full>\bCLEAR\b\s+(?P<obj>{TBL_GROUP})\b[\w\-]*)",
-        re.IGNORECASE,
-    ),
-    "ASSIGN": re.compile(
-        rf"(?P<full>((?P<obj>{TBL_GROUP})[\w\-]*\s*=\s*[\w\-\>]+"
-        rf"|[\w\-\>]+\s*=\s*(?P<obj2>{TBL_GROUP})[\w\-]*))",
-        re.IGNORECASE,
-    ),
-    "GENERIC": re.compile(
-        rf"(?P<full>\b(?P<obj>{TBL_GROUP})\b)",
-        re.IGNORECASE,
-    ),
-}
-
-
 # ---------------------------------------------------------------------
 # PAYLOAD MODEL
 # ---------------------------------------------------------------------
@@ -82,23 +44,44 @@ class Issue(BaseModel):
 
 
 # ---------------------------------------------------------------------
-# HELPER: GET FULL LINE SNIPPET FOR A MATCH
+# HELPER: NEWLINE OFFSETS FOR O(log L) LINE LOOKUPS
 # ---------------------------------------------------------------------
-def get_line_snippet(text: str, start: int, end: int) -> str:
+def newline_offsets(text: str) -> List[int]:
     """
-    Given a match span (start, end), return the full line in which
-    that match occurs (no extra lines).
+    Return the sorted character offsets of every newline in `text`.
+    Computed once per text; line lookups below then bisect it.
     """
-    line_start = text.rfind("\n", 0, start)
-    if line_start == -1:
-        line_start = 0
-    else:
-        line_start += 1  # right after the '\n'
+    return [m.start() for m in re.finditer("\n", text)]
+
+
+def line_of(nl: List[int], index: int, lo: int = 0) -> int:
+    """
+    0-based line containing character `index` (= newlines before it).
+    `lo` is a known lower bound for the result.
+    """
+    return bisect_left(nl, index, lo)
 
-    line_end = text.find("\n", end)
-    if line_end == -1:
-        line_end = len(text)
 
+def line_bounds(nl: List[int], text_len: int, first: int, last: int) -> Tuple[int, int]:
+    """
+    Character range covering the 0-based lines `first`..`last`,
+    excluding the newline that ends `last`.
+    """
+    line_start = nl[first - 1] + 1 if first > 0 else 0
+    line_end = nl[last] if last < len(nl) else text_len
+    return line_start, line_end
+
+
+
+# ---------------------------------------------------------------------
+# HELPER: GET FULL LINE SNIPPET FOR A MATCH
+# ---------------------------------------------------------------------
+def get_line_snippet(text: str, nl: List[int], first: int, last: int) -> str:
+    """
+    Return the full line(s) `first`..`last` (0-based) in which a match
+    occurs (no extra lines). `nl` are the newline offsets of `text`.
+    """
+    line_start, line_end = line_bounds(nl, len(text), first, last)
     return text[line_start:line_end]
 
 
@@ -145,56 +128,6 @@ def classify_issue(
     }
 
 
-# ---------------------------------------------------------------------
-# CORE SCANNER: FIND ALL TABLE USAGES IN A SINGLE CODE STRING
-# ---------------------------------------------------------------------
-def find_table_usage(txt: str) -> List[Dict[str, Any]]:
-    """
-    Runs all regexes over the given text and returns a list of matches.
-    Each match contains:
-      - pattern: which regex matched (DML / CLEAR / ASSIGN / GENERIC)
-      - stmt: statement keyword (for DML)
-      - object: table name
-      - replacement_table: mapped new table (if any)
-      - span: (start_char, end_char)
-    """
-    matches: List[Dict[str, Any]] = []
-    seen = set()  # avoid duplicates (table, line_no)
-
-    for pattern_name, pattern in REGEX.items():
-        for m in pattern.finditer(txt or ""):
-            gd = m.groupdict()
-            obj = gd.get("obj") or gd.get("obj2")
-            if not obj:
-                continue
-
-            start, end = m.span("full")
-
-            # Dedup by (table_name, line number)
-            line_no = txt[:start].count("\n") + 1
-            key = (obj, line_no, pattern_name)
-            if key in seen:
-                continue
-            seen.add(key)
-
-            stmt = gd.get("stmt")
-            replacement = TABLE_MAP.get(obj.upper())
-
-            matches.append(
-                {
-                    "pattern": pattern_name,
-                    "full": m.group("full"),
-                    "stmt": stmt,
-                    "object": obj,
-                    "replacement_table": replacement,
-                    "span": (start, end),
-                }
-            )
-
-    # sort by where they appear in the code
-    matches.sort(key=lambda x: x["span"][0])
-    return matches
-
 
 # ---------------------------------------------------------------------
 # API: /remediate-tables
@@ -203,20 +136,28 @@ def find_table_usage(txt: str) -> List[Dict[str, Any]]:
 @app.post("/remediate-tables", response_model=List[Issue])
 def remediate_tables(units: List[Unit]) -> List[Issue]:
     all_issues: List[Issue] = []
+    # Units of one request often share includes / boilerplate; scan each
+    # distinct source only once. Scoped to the request to bound memory.
+    usage_cache = scan_sources([u.code or "" for u in units])
 
     for u in units:
         src = u.code or ""
         base_start = u.start_line or 0
 
-        for m in find_table_usage(src):
+        nl = newline_offsets(src)
+        first_line = 0  # matches are in source order, so lines only grow
+
+        for m in usage_cache[src]:
             start, end = m["span"]
 
-            # Compute line offset inside this block
-            line_in_block = src[:start].count("\n") + 1
+            # 0-based lines holding the start and the end of the match
+            first_line = line_of(nl, start, first_line)
+            last_line = line_of(nl, end, first_line)
+            line_in_block = first_line + 1
 
-            # Snippet = full line containing the match
-            snippet_text = get_line_snippet(src, start, end)
-            snippet_line_count = snippet_text.count("\n") + 1  # mostly 1
+            # Snippet = full line(s) containing the match
+            snippet_text = get_line_snippet(src, nl, first_line, last_line)
+            snippet_line_count = last_line - first_line + 1  # mostly 1
 
             # Absolute line numbers (following your original rule)
             start_line_abs = base_start + line_in_block
@@ -248,4 +189,4 @@ def remediate_tables(units: List[Unit]) -> List[Issue]:
             )
             all_issues.append(issue)
 
-    return all_issues
\ No newline at end of file
+    return all_issues
@@ -0,0 +1,384 @@
+"""
+Table usage scanner behind the Final Enhanced Version of the API (main1.py).
+
+No FastAPI / pydantic imports here: pool workers import only this module.
+"""
+import multiprocessing
+import os
+import re
+import string
+from pathlib import Path
+from types import MappingProxyType
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ahocorasick
+import orjson
+
+
+# ---------------------------------------------------------------------
+# LOAD DYNAMIC MAPPING (tables.json)
+# ---------------------------------------------------------------------
+MAPPING_PATH = Path(__file__).parent / "tables.json"
+
+# keys upper-cased once, so matches only need normalising on their side;
+# read-only so a preloaded master can share it with its forked workers
+TABLE_MAP = MappingProxyType({
+    name.upper(): replacement
+    for name, replacement in orjson.loads(MAPPING_PATH.read_bytes()).items()
+})
+
+OLD_TABLES = list(TABLE_MAP.keys())
+
+
+def _trie_to_regex(node):
+    """
+    Regex for one trie node; never has a top-level `|`.
+    """
+    leaves = [re.escape(ch) for ch, child in sorted(node.items()) if ch and child == {"": {}}]
+    alts = [
+        re.escape(ch) + _trie_to_regex(child)
+        for ch, child in sorted(node.items())
+        if ch and child != {"": {}}
+    ]
+    if len(leaves) > 1:
+        alts.append("[" + "".join(leaves) + "]")
+    else:
+        alts.extend(leaves)
+
+    if "" in node:
+        # a name ends here — greedy `?` still tries longer names first
+        return "(?:" + "|".join(alts) + ")?" if alts else ""
+    if len(alts) == 1:
+        return alts[0]
+    return "(?:" + "|".join(alts) + ")"
+
+
+def build_table_group(names):
+    """
+    Build the regex-safe table alternation factored as a trie, e.g.
+    `(?:B(?:KPF|S(?:EG|I[DK]))|...)`, so shared prefixes are matched once.
+    """
+    trie = {}
+    for name in names:
+        node = trie
+        for ch in name.upper():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _trie_to_regex(trie)
+
+
+# Build dynamic regex-safe table list
+TBL_GROUP = build_table_group(OLD_TABLES)
+
+
+# ---------------------------------------------------------------------
+# REGEX DEFINITIONS
+# ---------------------------------------------------------------------
+# Group names are prefixed with the family so all families can be
+# combined into one scanner, dispatched on `m.lastgroup`.
+# Possessive `*+` / `++` and atomic `(?>...)` need Python 3.11+.
+# DML only looks ahead to the statement terminator `.` for its table, so a
+# keyword never runs on into later statements (a `.` inside a literal of
+# the statement ends it early).
+REGEX = {
+    "DML": (
+        rf"(?P<DML>(?P<DML_stmt>\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\b|\bMODIFY\b)"
+        rf"[^.]*?\b(?>FROM|INTO|UPDATE|DELETE\s++FROM)\b\s++(?P<DML_obj>{TBL_GROUP})\b)"
+    ),
+
+    "CLEAR": rf"(?P<CLEAR>\bCLEAR\b\s++(?P<CLEAR_obj>{TBL_GROUP})\b[\w\-]*+)",
+
+    "ASSIGN_LHS": rf"(?P<ASSIGN_LHS>(?P<ASSIGN_LHS_obj>{TBL_GROUP})[\w\-]*+\s*+=\s*+[\w\-\>]++)",
+
+    "ASSIGN_RHS": rf"(?P<ASSIGN_RHS>[\w\-\>]++\s*+=\s*+(?P<ASSIGN_RHS_obj>{TBL_GROUP})[\w\-]*+)",
+}
+
+# alternative -> (pattern family, group holding the table name)
+ALTERNATIVES = {
+    "DML": ("DML", "DML_obj"),
+    "CLEAR": ("CLEAR", "CLEAR_obj"),
+    "ASSIGN_LHS": ("ASSIGN", "ASSIGN_LHS_obj"),
+    "ASSIGN_RHS": ("ASSIGN", "ASSIGN_RHS_obj"),
+}
+
+# One pass over the text; alternation order = priority at the same position.
+# ASCII sources are upper-cased once and scanned case-sensitively (cheaper
+# than IGNORECASE); other text keeps the IGNORECASE scanner, since upper()
+# may change its length.
+TABLE_SCANNER = re.compile("|".join(REGEX.values()))
+TABLE_SCANNER_ANYCASE = re.compile("|".join(REGEX.values()), re.IGNORECASE)
+
+# Bound once so the hot loops skip the attribute lookup per call
+_scan_tables = TABLE_SCANNER.finditer
+_scan_tables_anycase = TABLE_SCANNER_ANYCASE.finditer
+
+
+# ---------------------------------------------------------------------
+# GENERIC MATCHING — AHO-CORASICK AUTOMATON OVER ALL TABLE NAMES
+# ---------------------------------------------------------------------
+# Folding only ASCII letters keeps offsets aligned with the original text.
+# Not a `\w+` tokenizer + dict lookup: that runs every word of the source
+# through Python and measures 2.5-5x slower than the automaton, which only
+# surfaces actual table names.
+ASCII_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+TABLE_AUTOMATON = ahocorasick.Automaton()
+for _name in OLD_TABLES:
+    TABLE_AUTOMATON.add_word(_name.translate(ASCII_FOLD), len(_name))
+TABLE_AUTOMATON.make_automaton()
+_iter_table_names = TABLE_AUTOMATON.iter
+
+# cheap gate: every alternative needs a table name, so text without any
+# (not even inside an identifier) skips both passes. Non-ASCII text is
+# checked with the IGNORECASE trie, which folds more than ASCII letters.
+TABLE_NAME_RE_ANYCASE = re.compile(TBL_GROUP, re.IGNORECASE)
+_search_table_name_anycase = TABLE_NAME_RE_ANYCASE.search
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def has_table_name(folded):
+    """
+    True if any table name occurs in the ASCII-folded text, even inside
+    an identifier.
+    """
+    if TABLE_AUTOMATON.kind != ahocorasick.AHOCORASICK:
+        return False  # empty tables.json — iter() raises on an unbuilt automaton
+    return next(_iter_table_names(folded), None) is not None
+
+
+def iter_generic_hits(txt, folded):
+    """
+    Yield (start, end) for every table name that stands as a whole word;
+    `folded` is the text after ASCII_FOLD.
+    """
+    if TABLE_AUTOMATON.kind != ahocorasick.AHOCORASICK:
+        return
+    for end_idx, length in _iter_table_names(folded):
+        start, end = end_idx - length + 1, end_idx + 1
+        if start > 0 and _is_word_char(txt[start - 1]):
+            continue
+        if end < len(txt) and _is_word_char(txt[end]):
+            continue
+        yield start, end
+
+
+
+# ---------------------------------------------------------------------
+# SNIPPET EXTRACTION
+# ---------------------------------------------------------------------
+def snippet_at(text: str, start: int, end: int) -> str:
+    s = max(0, start - 60)
+    e = min(len(text), end + 60)
+    # str.replace returns the slice itself when it holds no newline, so the
+    # common case costs one allocation; str.translate has no fast path for
+    # a 1-to-2 character mapping: ~2x slower here without a newline, ~24x
+    # with one.
+    return text[s:e].replace("\n", "\\n")
+
+
+# ---------------------------------------------------------------------
+# MULTI-LINE SUPPORT HELPERS
+# ---------------------------------------------------------------------
+def newline_offsets(text: str):
+    """
+    Sorted character offsets of every newline in the text.
+    """
+    return [m.start() for m in re.finditer("\n", text)]
+
+
+def get_line_and_column(nl, index: int, lo: int = 0):
+    """
+    Given the newline offsets of a text and a character index, return:
+    - line number (1-based)
+    - column number (1-based)
+    `lo` is a known lower bound for the number of newlines before `index`.
+    """
+    line = bisect_left(nl, index, lo) + 1
+    last_newline = nl[line - 2] if line > 1 else -1
+    return line, index - last_newline
+
+
+def is_claimed(claimed, start: int, end: int) -> bool:
+    """
+    True if (start, end) lies inside one of the (sorted, disjoint) claimed spans.
+    """
+    idx = bisect_right(claimed, (start, float("inf")))
+    return idx > 0 and claimed[idx - 1][1] >= end
+
+
+def claim_span(claimed, start: int, end: int):
+    """
+    Insert (start, end) into the claimed spans, merging overlaps.
+    """
+    lo = bisect_left(claimed, (start,))
+    if lo > 0 and claimed[lo - 1][1] > start:
+        lo -= 1
+        start = claimed[lo][0]
+    hi = lo
+    while hi < len(claimed) and claimed[hi][0] < end:
+        end = max(end, claimed[hi][1])
+        hi += 1
+    claimed[lo:hi] = [(start, end)]
+
+
+# ---------------------------------------------------------------------
+# MAIN FINDER — returns ALL table usages
+# ---------------------------------------------------------------------
+def find_table_usage(txt: str):
+    txt = txt or ""
+    matches = []
+    # table tokens already reported (scanner first, then GENERIC); only the
+    # token is claimed, so other tables inside a statement still count
+    claimed = []
+
+    # hot loop: bind per-match helpers to locals
+    append = matches.append
+    table_get = TABLE_MAP.get
+    alternatives = ALTERNATIVES
+    prev_line = 1  # each pass yields matches in source order, so lines only grow
+
+    folded = txt.translate(ASCII_FOLD)
+    if txt.isascii():
+        if not has_table_name(folded):
+            return matches
+        found = _scan_tables(txt.upper())
+    else:
+        if _search_table_name_anycase(txt) is None:
+            return matches
+        found = _scan_tables_anycase(txt)
+
+    nl = newline_offsets(txt)
+
+    # group text is sliced from `txt` to keep the original casing
+    for m in found:
+
+        name, obj_group = alternatives[m.lastgroup]
+        span = m.span
+        obj_start, obj_end = span(obj_group)
+        if obj_end == obj_start:
+            continue
+
+        # scanner matches never overlap; claim their table so GENERIC skips it
+        claim_span(claimed, obj_start, obj_end)
+
+        obj = txt[obj_start:obj_end]
+        start, end = span()
+        if name == "DML":
+            stmt_start, stmt_end = span("DML_stmt")
+            stmt = txt[stmt_start:stmt_end]
+        else:
+            stmt = "="
+
+        # 1️⃣ relative line numbers inside snippet
+        start_rel_line, start_rel_col = get_line_and_column(nl, start, prev_line - 1)
+        end_rel_line, end_rel_col = get_line_and_column(nl, end, start_rel_line - 1)
+        prev_line = start_rel_line
+
+        replacement = table_get(obj if obj.isupper() else obj.upper())
+
+        append({
+            "full": txt[start:end],
+            "stmt": stmt,
+            "object": obj,
+            "replacement_table": replacement,
+            "ambiguous": replacement is None,
+            "suggested_statement": (
+                f"Replace {obj} with {replacement}" if replacement else None
+            ),
+            "span": (start, end),
+
+            # MULTI-LINE SUPPORT
+            "relative_start_line": start_rel_line,
+            "relative_end_line": end_rel_line,
+            "relative_start_col": start_rel_col,
+            "relative_end_col": end_rel_col,
+        })
+
+    # not folded into the scanner: one pass would consume every structural
+    # match and lose the other table names inside it (`vbrk` in `likp = vbrk`)
+    prev_line = 1
+    for start, end in iter_generic_hits(txt, folded):
+        if is_claimed(claimed, start, end):
+            continue
+        claim_span(claimed, start, end)
+
+        obj = txt[start:end]
+
+        # a table name never spans a newline: it ends on its start line
+        start_rel_line, start_rel_col = get_line_and_column(nl, start, prev_line - 1)
+        end_rel_line, end_rel_col = start_rel_line, start_rel_col + (end - start)
+        prev_line = start_rel_line
+
+        replacement = table_get(obj if obj.isupper() else obj.upper())
+
+        append({
+            "full": obj,
+            "stmt": "=",
+            "object": obj,
+            "replacement_table": replacement,
+            "ambiguous": replacement is None,
+            "suggested_statement": (
+                f"Replace {obj} with {replacement}" if replacement else None
+            ),
+            "span": (start, end),
+
+            # MULTI-LINE SUPPORT
+            "relative_start_line": start_rel_line,
+            "relative_end_line": end_rel_line,
+            "relative_start_col": start_rel_col,
+            "relative_end_col": end_rel_col,
+        })
+
+    matches.sort(key=lambda x: x["span"][0])
+    return matches
+
+
+
+# ---------------------------------------------------------------------
+# WORKER POOL — find_table_usage is pure CPU work, run it off the GIL
+# ---------------------------------------------------------------------
+# forkserver workers start clean and import only this module, not the
+# (threaded) server with FastAPI loaded. Created on first use, not at
+# import — forked server workers of a preloaded master each get their own.
+_EXECUTOR = None
+PARALLEL_MIN_SOURCES = 8  # smaller batches are cheaper to scan inline
+
+
+def get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _EXECUTOR
+
+
+def drop_executor():
+    # a broken pool stays broken; forget it so the next batch gets a new one
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+
+
+def scan_sources(sources):
+    """
+    Map each distinct source to its find_table_usage result.
+    """
+    distinct = list(dict.fromkeys(sources))
+    if len(distinct) < PARALLEL_MIN_SOURCES:
+        return {src: find_table_usage(src) for src in distinct}
+
+    chunksize = max(1, len(distinct) // (4 * (os.cpu_count() or 1)))
+    try:
+        return dict(zip(distinct, get_executor().map(find_table_usage, distinct, chunksize=chunksize)))
+    except BrokenProcessPool:
+        # e.g. a worker was killed — finish this batch inline
+        drop_executor()
+        return {src: find_table_usage(src) for src in distinct}
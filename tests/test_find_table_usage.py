@@ -0,0 +1,153 @@
+import importlib
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import scanner, scanner1  # noqa: E402
+
+
+def import_with_mapping(package: str, mapping_json: str, tmp: str, *modules: str):
+    """
+    Import fresh copies of `modules` from `tmp/package`, with `mapping_json`
+    as their tables.json (the mapping is read once, at import).
+    """
+    shutil.copytree(
+        ROOT / "app", Path(tmp) / package,
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    (Path(tmp) / package / "tables.json").write_text(mapping_json)
+    sys.path.insert(0, tmp)
+    try:
+        return [importlib.import_module(f"{package}.{name}") for name in modules]
+    finally:
+        sys.path.remove(tmp)
+
+
+class GenericMatchTest(unittest.TestCase):
+    def test_only_whole_words_are_reported(self):
+        txt = "DATA lv_bkpf TYPE c.\nWRITE zbkpf.\nWRITE bkpf-belnr."
+        for module in (scanner, scanner1):
+            found = [(m["object"], m["span"]) for m in module.find_table_usage(txt)]
+            self.assertEqual(found, [("bkpf", (40, 44))])
+
+
+class MultiStatementTest(unittest.TestCase):
+    # a DML keyword must not run on to a later statement's table and
+    # swallow the table usages in between
+    def check(self, txt, expected):
+        for module in (scanner, scanner1):
+            found = [m["object"] for m in module.find_table_usage(txt)]
+            self.assertEqual(found, [obj for _, obj in expected])
+
+        found = [(m["pattern"], m["object"]) for m in scanner.find_table_usage(txt)]
+        self.assertEqual(found, expected)
+
+    def test_modify_without_table_before_later_statements(self):
+        self.check(
+            "MODIFY BSEG FROM ls_bseg.\nCLEAR MARA.\nlv = VBAK-VBELN.\nSELECT * FROM BKPF INTO ls.\n",
+            [("GENERIC", "BSEG"), ("CLEAR", "MARA"), ("ASSIGN", "VBAK"), ("DML", "BKPF")],
+        )
+
+    def test_tables_inside_a_match_are_still_reported(self):
+        # `likp = vbrk` is one ASSIGN match, but only LIKP is its table
+        self.check(
+            "likp = vbrk.\nMODIFY BSEG FROM ls.\nCLEAR MARA.\nSELECT * FROM BKPF INTO ls.",
+            [("ASSIGN", "likp"), ("GENERIC", "vbrk"), ("GENERIC", "BSEG"),
+             ("CLEAR", "MARA"), ("DML", "BKPF")],
+        )
+
+    def test_dml_reports_its_own_keyword(self):
+        txt = "MODIFY BSEG FROM ls.\nSELECT * FROM BKPF INTO ls."
+        dml = [m for m in scanner.find_table_usage(txt) if m["pattern"] == "DML"]
+        self.assertEqual([(m["stmt"], m["object"]) for m in dml], [("SELECT", "BKPF")])
+
+
+class CaseFoldTest(unittest.TestCase):
+    def test_original_casing_is_reported(self):
+        txt = "select * from Bkpf into ls.\nclear Mara."
+        for module in (scanner, scanner1):
+            found = [(m["full"], m["object"]) for m in module.find_table_usage(txt)]
+            self.assertEqual(found, [("select * from Bkpf", "Bkpf"), ("clear Mara", "Mara")])
+        dml = scanner.find_table_usage(txt)[0]
+        self.assertEqual(dml["stmt"], "select")
+
+    def test_non_ascii_source_keeps_offsets(self):
+        # "ß".upper() is "SS": scanning an upper-cased copy would shift spans
+        txt = "Straße = bkpf.\nSELECT * FROM Bkpf INTO ls."
+        for module in (scanner, scanner1):
+            found = [(m["span"], m["full"], m["object"]) for m in module.find_table_usage(txt)]
+            self.assertEqual(found, [
+                ((0, 13), "Straße = bkpf", "bkpf"),
+                ((15, 33), "SELECT * FROM Bkpf", "Bkpf"),
+            ])
+
+
+class TableNameGateTest(unittest.TestCase):
+    def check(self, txt, expected):
+        for module in (scanner, scanner1):
+            found = [(m["full"], m["object"]) for m in module.find_table_usage(txt)]
+            self.assertEqual(found, expected)
+
+    def test_source_without_table_name(self):
+        self.check("SELECT * FROM zfoo INTO ls.\nWRITE x.", [])
+
+    def test_table_name_inside_identifier_passes_the_gate(self):
+        self.check("lv_x = bkpf_old.", [("lv_x = bkpf_old", "bkpf")])
+
+    def test_non_ascii_case_folding_passes_the_gate(self):
+        # IGNORECASE matches the long s with S; ASCII folding does not
+        self.check("CLEAR Bſeg.", [("CLEAR Bſeg", "Bſeg")])
+
+
+class Main1PositionTest(unittest.TestCase):
+    def test_lines_and_columns_of_multi_line_match(self):
+        txt = "DATA x.\nSELECT *\n  FROM bkpf\n  INTO ls.\nWRITE mara."
+        positions = {
+            m["span"]: (
+                m["relative_start_line"], m["relative_start_col"],
+                m["relative_end_line"], m["relative_end_col"],
+            )
+            for m in scanner1.find_table_usage(txt)
+        }
+        # 1-based; a match right after a newline starts in column 1
+        self.assertEqual(positions[(8, 28)], (2, 1, 3, 12))
+        self.assertEqual(positions[(46, 50)], (5, 7, 5, 11))
+
+
+class EmptyMappingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.main, cls.main1, cls.scanner, cls.scanner1 = import_with_mapping(
+            "empty_mapping_app", "{}", cls.tmp, "main", "main1", "scanner", "scanner1"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def test_nothing_is_found(self):
+        for module in (self.scanner, self.scanner1):
+            self.assertEqual(module.find_table_usage("SELECT * FROM BKPF INTO ls."), [])
+
+    def test_endpoints_still_answer(self):
+        unit = {"pgm_name": "P", "inc_name": "I", "type": "T", "start_line": 1,
+                "code": "SELECT * FROM BKPF INTO ls."}
+
+        response = TestClient(self.main.app).post("/remediate-tables", json=[unit])
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+        response = TestClient(self.main1.app).post("/remediate-tables", json=[unit])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["table_replacements"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import main, main1  # noqa: E402
+
+
+def unit(code, start_line=10):
+    return {"pgm_name": "P", "inc_name": "I", "type": "T",
+            "start_line": start_line, "code": code}
+
+
+class MainEndpointTest(unittest.TestCase):
+    def post(self, *units):
+        response = TestClient(main.app).post("/remediate-tables", json=list(units))
+        self.assertEqual(response.status_code, 200)
+        return [(i["start_line"], i["end_line"], i["snippet"]) for i in response.json()]
+
+    def test_line_numbers_and_snippets(self):
+        # a multi-line match reports all of its lines; end_line keeps the
+        # original rule (start line + number of snippet lines)
+        found = self.post(unit("DATA x.\nSELECT *\n  FROM bkpf\n  INTO ls.\nWRITE mara."))
+        self.assertEqual(found, [
+            (12, 14, "SELECT *\\n  FROM bkpf"),
+            (15, 16, "WRITE mara."),
+        ])
+
+    def test_first_line_and_missing_start_line(self):
+        found = self.post(unit("CLEAR bkpf.\nWRITE x.\n", start_line=None))
+        self.assertEqual(found, [(1, 2, "CLEAR bkpf.")])
+
+
+class Main1EndpointTest(unittest.TestCase):
+    def post(self, *units):
+        response = TestClient(main1.app).post("/remediate-tables", json=list(units))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        return response.json()
+
+    def test_table_replacements(self):
+        found = self.post(unit("DATA x.\nSELECT *\n  FROM bkpf\n  INTO ls."))
+        self.assertEqual(found[0]["code"], "DATA x.\nSELECT *\n  FROM bkpf\n  INTO ls.")
+        self.assertEqual(
+            [(r["table"], r["start_line"], r["end_line"], r["start_column"], r["end_column"])
+             for r in found[0]["table_replacements"]],
+            [("bkpf", 11, 12, 1, 12)],
+        )
+
+    def test_integers_wider_than_64_bits(self):
+        # orjson cannot encode these; the stdlib encoder still answers
+        big = 2 ** 64
+        found = self.post(unit("CLEAR bkpf.", start_line=big))
+        self.assertEqual(found[0]["start_line"], big)
+        self.assertEqual(found[0]["table_replacements"][0]["start_line"], big)
+
+
+if __name__ == "__main__":
+    unittest.main()
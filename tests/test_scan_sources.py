@@ -0,0 +1,53 @@
+import os
+import signal
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import scanner, scanner1  # noqa: E402
+
+# enough distinct sources to go through the worker pool
+SOURCES = [f"SELECT * FROM MARA INTO ls_{i}.\nCLEAR bkpf." for i in range(40)]
+
+
+class ScanSourcesTest(unittest.TestCase):
+    def tearDown(self):
+        for module in (scanner, scanner1):
+            module.drop_executor()
+
+    def test_pool_matches_inline_scan(self):
+        for module in (scanner, scanner1):
+            self.assertGreaterEqual(len(SOURCES), module.PARALLEL_MIN_SOURCES)
+            inline = {src: module.find_table_usage(src) for src in SOURCES}
+            self.assertEqual(module.scan_sources(SOURCES + SOURCES[:5]), inline)
+            self.assertIsNotNone(module._EXECUTOR)
+
+    def test_broken_pool_falls_back_and_is_replaced(self):
+        for module in (scanner, scanner1):
+            expected = module.scan_sources(SOURCES)
+            pool = module._EXECUTOR
+            os.kill(next(iter(pool._processes)), signal.SIGKILL)
+
+            # this batch is scanned inline, the next one on a new pool
+            self.assertEqual(module.scan_sources(SOURCES), expected)
+            self.assertEqual(module.scan_sources(SOURCES), expected)
+            self.assertIsNotNone(module._EXECUTOR)
+            self.assertIsNot(module._EXECUTOR, pool)
+
+    def test_scanner_modules_do_not_import_fastapi(self):
+        # pool workers import only these modules
+        out = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, app.scanner, app.scanner1; "
+             "print(sorted({'fastapi', 'pydantic', 'starlette'} & set(sys.modules)))"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(out.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()